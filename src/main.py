@@ -1,22 +1,155 @@
-```python
-from fastapi import FastAPI, Depends, HTTPException, status
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime
+from fastapi import (
+    FastAPI, Body, Depends, HTTPException, Query, status, BackgroundTasks,
+)
+from sqlalchemy import (
+    create_engine, event, func, insert, select, update, and_, inspect, or_, text,
+    Column, Integer, String, Float, DateTime, ForeignKey, Index, Text,
+)
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from pydantic import BaseModel
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.schema import CreateColumn
+from pydantic import BaseModel, ConfigDict, TypeAdapter
 from typing import List, Optional, Dict, Any
 import mlflow
-import uuid
+from mlflow.entities import Metric as MlflowMetric, Param as MlflowParam
+from mlflow.exceptions import RestException
+from mlflow.tracking import MlflowClient
+import atexit
 import datetime
+import logging
+import os
+import queue
+import shutil
+import socket
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager, contextmanager
+from functools import partial, wraps
+from anyio import to_thread
+from cachetools import TTLCache, cached
+from cachetools.keys import hashkey
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+import orjson
+import pybreaker
+import requests
+from uuid6 import uuid7
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
 
 # Initialize database
-engine = create_engine("sqlite:///./neura_orchestra.db", connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./neura_orchestra.db")
+_url = make_url(DATABASE_URL)
+_is_sqlite = _url.get_backend_name() == "sqlite"
+if _is_sqlite and _url.database in (None, "", ":memory:"):
+    # An in-memory database only exists on the connection that opened it, and
+    # a single sqlite3 connection cannot serve concurrent transactions from
+    # the worker threads. Keep the throwaway semantics with a temporary file.
+    _memory_db_dir = tempfile.mkdtemp(prefix="neura_orchestra-")
+    atexit.register(shutil.rmtree, _memory_db_dir, ignore_errors=True)
+    _url = _url.set(database=os.path.join(_memory_db_dir, "neura_orchestra.db"))
+if issubclass(_url.get_dialect().get_pool_class(_url), QueuePool):
+    _pool_args = {
+        "pool_size": 20,
+        "max_overflow": 10,
+        "pool_timeout": 30,
+        "pool_recycle": 3600,
+    }
+else:
+    _pool_args = {}
+engine = create_engine(
+    _url,
+    connect_args={"check_same_thread": False, "timeout": 30} if _is_sqlite else {},
+    pool_pre_ping=True,
+    **_pool_args,
+)
+
+if _is_sqlite:
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        # WAL lets readers proceed while a writer holds the lock, and with
+        # synchronous=NORMAL a commit no longer waits for an fsync
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA mmap_size=268435456")
+        # Unknown job ids are rejected by the metrics/hyperparameters foreign keys
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+# Rows keep their loaded state after commit; the write endpoints return them
+# without reloading. Column defaults are Python-side and the primary key comes
+# back from the INSERT, so nothing is stale.
+SessionLocal = sessionmaker(
+    autocommit=False, autoflush=False, expire_on_commit=False, bind=engine
+)
 Base = declarative_base()
 
 # MLflow setup
-mlflow.set_tracking_uri("http://mlflow-server:8080")
+MLFLOW_TRACKING_URI = os.getenv("MLFLOW_TRACKING_URI", "http://mlflow-server:8080")
+MLFLOW_EXPERIMENT_ID = os.getenv("MLFLOW_EXPERIMENT_ID", "0")
+mlflow.set_tracking_uri(MLFLOW_TRACKING_URI)
+
+# MLflow's REST store keeps one keep-alive requests.Session per tracking URI;
+# size its connection pool for the worker threads that log concurrently. Must
+# be set before the first request, when the session is built.
+os.environ.setdefault("MLFLOW_HTTP_POOL_CONNECTIONS", "20")
+os.environ.setdefault("MLFLOW_HTTP_POOL_MAXSIZE", "50")
+# Fail fast instead of MLflow's default 120s timeout with 7 retries; the
+# circuit breaker and pending_mlflow_events table take over from there.
+os.environ.setdefault("MLFLOW_HTTP_REQUEST_TIMEOUT", "5")
+os.environ.setdefault("MLFLOW_HTTP_REQUEST_MAX_RETRIES", "1")
+
+# Shared by every background task; unlike the fluent API the client keeps no
+# implicit active-run state, so concurrent threads cannot log into each other's runs.
+mlflow_client = MlflowClient(tracking_uri=MLFLOW_TRACKING_URI)
+
+def _is_unavailable(exc: BaseException) -> bool:
+    """Whether ``exc`` means MLflow could not be reached at all.
+
+    The MLflow client wraps connection errors and timeouts in an
+    ``MlflowException``, so the whole ``__cause__``/``__context__`` chain is
+    searched.
+    """
+    while exc is not None:
+        if isinstance(exc, (
+            pybreaker.CircuitBreakerError,
+            ConnectionError,
+            TimeoutError,
+            requests.exceptions.ConnectionError,
+            requests.exceptions.Timeout,
+            requests.exceptions.RetryError,
+        )):
+            return True
+        exc = exc.__cause__ or exc.__context__
+    return False
+
+# Opens after 5 consecutive failures to reach MLflow and lets a trial call
+# through after 30s. Batches the server answered but rejected or failed do not
+# count, so a single bad batch cannot open it and defer everyone's logging.
+mlflow_breaker = pybreaker.CircuitBreaker(
+    fail_max=5, reset_timeout=30, exclude=[lambda exc: not _is_unavailable(exc)]
+)
+
+# Replays of a deferred batch before it is dead-lettered
+MLFLOW_REPLAY_MAX_ATTEMPTS = int(os.getenv("MLFLOW_REPLAY_MAX_ATTEMPTS", "5"))
+# A claim on a deferred batch this old is assumed to belong to a worker that
+# died mid-replay, and the batch is up for grabs again
+_REPLAY_CLAIM_TIMEOUT = datetime.timedelta(minutes=5)
+
+# job_id -> MLflow run_id, a cache of TrainingJob.mlflow_run_id
+_run_ids: Dict[str, str] = {}
 
 # Database models
 class ModelVersion(Base):
@@ -29,45 +162,546 @@ class ModelVersion(Base):
 class TrainingJob(Base):
     __tablename__ = "training_jobs"
     id = Column(Integer, primary_key=True)
-    job_id = Column(String, unique=True, default=lambda: str(uuid.uuid4()))
+    # Time-ordered UUIDv7, so new jobs and their metrics append to the end of
+    # the job_id indexes instead of landing on random pages
+    job_id = Column(String(36), unique=True, default=lambda: str(uuid7()))
     model_name = Column(String, index=True)
     status = Column(String, default="pending")
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    # Recorded by whichever worker creates the job's MLflow run
+    mlflow_run_id = Column(String)
 
 class Metric(Base):
     __tablename__ = "metrics"
+    # Also serves plain job_id lookups, so job_id needs no index of its own
+    __table_args__ = (Index("ix_metrics_job_ts", "job_id", "timestamp"),)
     id = Column(Integer, primary_key=True)
-    job_id = Column(String, index=True)
+    job_id = Column(String, ForeignKey("training_jobs.job_id"))
     metric_name = Column(String)
     value = Column(Float)
     timestamp = Column(DateTime, default=datetime.datetime.utcnow)
 
+# MLflow batches that could not be delivered, replayed by the batch logger
+class PendingMlflowEvent(Base):
+    __tablename__ = "pending_mlflow_events"
+    id = Column(Integer, primary_key=True)
+    job_id = Column(String)
+    payload = Column(Text)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    # Failed replays; set instead of deleting the row once the batch is given up on
+    attempts = Column(Integer, default=0, server_default="0")
+    dead_lettered_at = Column(DateTime)
+    # Worker process currently replaying the batch
+    claimed_by = Column(String)
+    claimed_at = Column(DateTime)
+
 class Hyperparameter(Base):
     __tablename__ = "hyperparameters"
+    __table_args__ = (Index("ix_hyperparameters_job_ts", "job_id", "timestamp"),)
     id = Column(Integer, primary_key=True)
-    job_id = Column(String, index=True)
+    job_id = Column(String, ForeignKey("training_jobs.job_id"))
     param_name = Column(String)
     param_value = Column(Float)
     timestamp = Column(DateTime, default=datetime.datetime.utcnow)
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+def _add_missing_columns():
+    """Add columns added to the models after their table already existed."""
+    preparer = engine.dialect.identifier_preparer
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        for table in Base.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_ddl = CreateColumn(column).compile(dialect=engine.dialect)
+                    conn.execute(text(
+                        f"ALTER TABLE {preparer.format_table(table)} "
+                        f"ADD COLUMN {column_ddl}"
+                    ))
+
+def _create_missing_indexes():
+    """Create indexes added to the models after their table already existed."""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+# Deployments that manage the schema with migrations set this to "0"
+AUTO_CREATE_SCHEMA = os.getenv("AUTO_CREATE_SCHEMA", "1") == "1"
+
+# Application-wide key of the advisory lock taken around schema creation
+_SCHEMA_LOCK_KEY = 8_263_704_151
+_SCHEMA_LOCK_NAME = "neura_orchestra.init_schema"
+
+@contextmanager
+def _schema_lock():
+    """Hold an exclusive lock shared by every worker process of the database.
+
+    PostgreSQL and MySQL use a session-level advisory lock, a SQLite file
+    database an exclusive lock on a file next to it. Other backends are not
+    locked, which is logged.
+    """
+    backend = engine.url.get_backend_name()
+    if backend == "postgresql":
+        lock = "SELECT pg_advisory_lock(:key)"
+        unlock = "SELECT pg_advisory_unlock(:key)"
+        params = {"key": _SCHEMA_LOCK_KEY}
+    elif backend in ("mysql", "mariadb"):
+        lock = "SELECT GET_LOCK(:name, -1)"
+        unlock = "SELECT RELEASE_LOCK(:name)"
+        params = {"name": _SCHEMA_LOCK_NAME}
+    else:
+        lock = unlock = None
+    if lock is not None:
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text(lock), params)
+            try:
+                yield
+            finally:
+                conn.execute(text(unlock), params)
+        return
+
+    database = engine.url.database
+    if _is_sqlite and fcntl is not None and database and database != ":memory:":
+        with open(f"{database}.schema.lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+        return
+
+    if not _is_sqlite:
+        logger.warning(
+            "No schema lock for %s databases; set AUTO_CREATE_SCHEMA=0 and "
+            "create the schema once when running several workers", backend
+        )
+    yield
+
+def init_schema():
+    """Create missing tables, columns and indexes.
+
+    Every worker process calls this on startup. The workers take turns
+    through ``_schema_lock``, so they do not race each other's DDL.
+    """
+    with _schema_lock():
+        Base.metadata.create_all(bind=engine)
+        _add_missing_columns()
+        _create_missing_indexes()
+
+# MLflow background tasks
+class _RunNotReady(Exception):
+    """The MLflow run of a job has not been created yet."""
+
+def _stored_run_id(job_id: str) -> Optional[str]:
+    db = SessionLocal()
+    try:
+        return db.scalar(
+            select(TrainingJob.mlflow_run_id).where(TrainingJob.job_id == job_id)
+        )
+    finally:
+        db.close()
+
+def _store_run_id(job_id: str, run_id: str) -> str:
+    """Record ``run_id`` on the job unless a run was recorded already.
+
+    Returns the run id the job ended up with.
+    """
+    db = SessionLocal()
+    try:
+        stored = db.execute(
+            update(TrainingJob)
+            .where(TrainingJob.job_id == job_id, TrainingJob.mlflow_run_id.is_(None))
+            .values(mlflow_run_id=run_id)
+        ).rowcount
+        db.commit()
+    finally:
+        db.close()
+    return run_id if stored else _stored_run_id(job_id) or run_id
+
+def _create_job_run(job_id: str) -> str:
+    """Create the MLflow run of a new training job.
+
+    Only the job's creation batch calls this. If another worker got to record
+    a run first, the one created here is deleted again and the recorded run
+    is used instead.
+    """
+    run_id = _run_ids.get(job_id) or _stored_run_id(job_id)
+    if run_id is None:
+        run = mlflow_client.create_run(MLFLOW_EXPERIMENT_ID, run_name=job_id)
+        run_id = run.info.run_id
+        winner = _store_run_id(job_id, run_id)
+        if winner != run_id:
+            mlflow_client.delete_run(run_id)
+            run_id = winner
+    _run_ids[job_id] = run_id
+    return run_id
+
+def _get_run_id(job_id: str) -> Optional[str]:
+    """Look up the MLflow run of ``job_id``, ``None`` if it does not exist yet."""
+    run_id = _run_ids.get(job_id) or _stored_run_id(job_id)
+    if run_id is None:
+        # Jobs from before run ids were recorded only have a run named after them
+        runs = mlflow_client.search_runs(
+            experiment_ids=[MLFLOW_EXPERIMENT_ID],
+            filter_string=f"tags.mlflow.runName = '{job_id}'",
+            max_results=1,
+            order_by=["attributes.start_time ASC"],
+        )
+        if not runs:
+            return None
+        run_id = _store_run_id(job_id, runs[0].info.run_id)
+    _run_ids[job_id] = run_id
+    return run_id
+
+def _send_batch(job_id: str, metrics: List[MlflowMetric], params: List[MlflowParam],
+                create_run: bool = False):
+    """Log a batch to the job's run; ``create_run`` marks the job's creation batch."""
+    if create_run:
+        run_id = _create_job_run(job_id)
+    else:
+        run_id = _get_run_id(job_id)
+        if run_id is None:
+            raise _RunNotReady(job_id)
+    mlflow_client.log_batch(run_id, metrics=metrics, params=params, tags=[])
+    if create_run:
+        mlflow_client.set_terminated(run_id)
+
+def _defer(job_id: str, metrics: List[MlflowMetric], params: List[MlflowParam],
+           create_run: bool = False):
+    """Persist a batch to ``pending_mlflow_events`` for a later replay."""
+    payload = orjson.dumps({
+        "metrics": [[m.key, m.value, m.timestamp, m.step] for m in metrics],
+        "params": [[p.key, p.value] for p in params],
+        "create_run": create_run,
+    }).decode()
+    db = SessionLocal()
+    try:
+        db.add(PendingMlflowEvent(job_id=job_id, payload=payload))
+        db.commit()
+    finally:
+        db.close()
+
+def _log_to_mlflow(job_id: str, metrics: List[MlflowMetric], params: List[MlflowParam],
+                   create_run: bool = False):
+    """Send a batch through the circuit breaker.
+
+    Batches are deferred while MLflow is down or the job's run has not been
+    created yet.
+    """
+    try:
+        mlflow_breaker.call(_send_batch, job_id, metrics, params, create_run)
+    except RestException:
+        logger.exception("MLflow rejected batch for job %s", job_id)
+    except Exception as exc:
+        logger.warning("Deferring %d MLflow entries for job %s: %s",
+                       len(metrics) + len(params), job_id, exc)
+        _defer(job_id, metrics, params, create_run)
+
+def _worker_id() -> str:
+    # Looked up on every call, the pid changes when a worker is forked
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def _drain_pending(limit: int = 100) -> None:
+    """Replay deferred batches oldest first.
+
+    Every worker process drains the same table, so each batch is first
+    claimed with a conditional UPDATE and only sent by the worker whose
+    claim went through.
+
+    Replay stops as soon as MLflow turns out to be unavailable. A batch that
+    fails for any other reason is skipped and retried by later drains; it is
+    dead-lettered once MLflow rejects it or it has failed
+    ``MLFLOW_REPLAY_MAX_ATTEMPTS`` times.
+    """
+    worker_id = _worker_id()
+    claimable = and_(
+        PendingMlflowEvent.dead_lettered_at.is_(None),
+        or_(
+            PendingMlflowEvent.claimed_by.is_(None),
+            PendingMlflowEvent.claimed_at
+            < datetime.datetime.utcnow() - _REPLAY_CLAIM_TIMEOUT,
+        ),
+    )
+    db = SessionLocal()
+    try:
+        pending_ids = db.scalars(
+            select(PendingMlflowEvent.id)
+            .where(claimable)
+            .order_by(PendingMlflowEvent.id)
+            .limit(limit)
+        ).all()
+        for pending_id in pending_ids:
+            claimed = db.execute(
+                update(PendingMlflowEvent)
+                .where(PendingMlflowEvent.id == pending_id, claimable)
+                .values(claimed_by=worker_id, claimed_at=datetime.datetime.utcnow())
+            ).rowcount
+            pending = db.get(PendingMlflowEvent, pending_id) if claimed else None
+            # Commits the claim and gives the connection back while MLflow is called
+            db.commit()
+            if pending is None:
+                continue
+            payload = orjson.loads(pending.payload)
+            try:
+                mlflow_breaker.call(
+                    _send_batch,
+                    pending.job_id,
+                    [MlflowMetric(*m) for m in payload["metrics"]],
+                    [MlflowParam(*p) for p in payload["params"]],
+                    # Batches deferred before the flag was renamed
+                    payload.get("create_run", payload.get("terminate", False)),
+                )
+            except Exception as exc:
+                pending.claimed_by = None
+                pending.claimed_at = None
+                if _is_unavailable(exc):
+                    db.commit()
+                    break
+                pending.attempts = (pending.attempts or 0) + 1
+                if (
+                    isinstance(exc, RestException)
+                    or pending.attempts >= MLFLOW_REPLAY_MAX_ATTEMPTS
+                ):
+                    pending.dead_lettered_at = datetime.datetime.utcnow()
+                    logger.error(
+                        "Dead-lettering deferred MLflow batch %d for job %s "
+                        "after %d attempts: %s",
+                        pending.id, pending.job_id, pending.attempts, exc,
+                    )
+                else:
+                    logger.warning(
+                        "Replay of deferred MLflow batch %d failed, retrying later: %s",
+                        pending.id, exc,
+                    )
+            else:
+                db.delete(pending)
+            db.commit()
+    finally:
+        db.close()
+
+def _bg_log_job(job_id: str, params: Dict[str, Any], hparams: Dict[str, float]):
+    """Create the MLflow run for a training job and log its initial config."""
+    timestamp = int(time.time() * 1000)
+    try:
+        _log_to_mlflow(
+            job_id,
+            metrics=[MlflowMetric(k, v, timestamp, 0) for k, v in hparams.items()],
+            params=[MlflowParam(k, str(v)) for k, v in params.items()],
+            create_run=True,
+        )
+    except Exception:
+        logger.exception("Failed to log training job %s to MLflow", job_id)
+
+class MlflowBatchLogger:
+    """Coalesce per-request metric/param logging into ``log_batch`` calls per run.
+
+    Entries are queued by the request handlers and drained by a daemon thread
+    that flushes once ``batch_size`` entries are pending or ``flush_interval``
+    seconds have passed since the first one, whichever comes first. Every
+    ``drain_interval`` seconds the same thread also replays batches that were
+    deferred while MLflow was unavailable.
+    """
+
+    def __init__(self, batch_size: int = 100, flush_interval: float = 0.5,
+                 drain_interval: float = 5.0):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.drain_interval = drain_interval
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start the background flush thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="mlflow-batch-logger", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Flush pending entries and stop the background thread."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def log_metric(self, job_id: str, key: str, value: float, timestamp: int) -> None:
+        """Queue a metric for the MLflow run of ``job_id``."""
+        self._queue.put((job_id, MlflowMetric(key, value, timestamp, 0)))
+
+    def log_param(self, job_id: str, key: str, value: Any) -> None:
+        """Queue a parameter for the MLflow run of ``job_id``."""
+        self._queue.put((job_id, MlflowParam(key, str(value))))
+
+    def _run(self) -> None:
+        next_drain = 0.0
+        while True:
+            if time.monotonic() >= next_drain:
+                try:
+                    _drain_pending()
+                except Exception:
+                    logger.exception("Failed to replay deferred MLflow batches")
+                next_drain = time.monotonic() + self.drain_interval
+            try:
+                item = self._queue.get(timeout=self.drain_interval)
+            except queue.Empty:
+                continue
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            stopping = False
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._flush(batch)
+            if stopping:
+                return
+
+    def _flush(self, batch: List[tuple]) -> None:
+        by_job: Dict[str, tuple] = defaultdict(lambda: ([], {}))
+        for job_id, entity in batch:
+            metrics, params = by_job[job_id]
+            if isinstance(entity, MlflowMetric):
+                metrics.append(entity)
+            else:
+                # MLflow rejects duplicate param keys within one batch
+                params[entity.key] = entity
+        for job_id, (metrics, params) in by_job.items():
+            # Params get a log_batch of their own: MLflow rejects the whole
+            # batch when a param's value changes, and that must not take the
+            # job's metrics down with it
+            if metrics:
+                self._log(job_id, metrics, [])
+            if params:
+                self._log(job_id, [], list(params.values()))
+
+    def _log(self, job_id: str, metrics: List[MlflowMetric],
+             params: List[MlflowParam]) -> None:
+        try:
+            _log_to_mlflow(job_id, metrics, params)
+        except Exception:
+            logger.exception("Failed to log batch for job %s to MLflow", job_id)
+
+mlflow_batcher = MlflowBatchLogger(
+    batch_size=int(os.getenv("MLFLOW_BATCH_SIZE", "100")),
+    flush_interval=float(os.getenv("MLFLOW_FLUSH_INTERVAL", "0.5")),
+)
+
+# Sync endpoints run on anyio's default thread limiter, which caps them at 40
+# concurrent requests.
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", "200"))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if AUTO_CREATE_SCHEMA:
+        init_schema()
+    if not CORS_ALLOW_ORIGINS:
+        logger.warning(
+            "CORS_ALLOW_ORIGINS is not set; browsers on other origins "
+            "will be blocked from calling the API"
+        )
+    to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+    mlflow_batcher.start()
+    yield
+    mlflow_batcher.stop()
 
 # FastAPI app
 app = FastAPI(
     title="NeuraOrchestra",
     description="AI Training Orchestration Platform",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan,
 )
 
-# CORS middleware
+# CORS middleware; browsers cache the preflight response for max_age seconds
+CORS_ALLOW_ORIGINS = [
+    origin.strip()
+    for origin in os.getenv("CORS_ALLOW_ORIGINS", "").split(",")
+    if origin.strip()
+]
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_origins=CORS_ALLOW_ORIGINS,
+    allow_methods=["GET", "POST", "PATCH"],
+    allow_headers=["authorization", "content-type"],
+    max_age=86400,
 )
 
+# Read-through caches for the GET endpoints; write endpoints evict the
+# entries they make stale in their own process, the TTL bounds how long other
+# worker processes can keep serving them.
+_cache_lock = threading.RLock()
+_model_versions_cache = TTLCache(maxsize=1024, ttl=5)
+_metrics_cache = TTLCache(maxsize=1024, ttl=5)
+_hyperparameters_cache = TTLCache(maxsize=1024, ttl=5)
+_mlflow_runs_cache = TTLCache(maxsize=64, ttl=30)
+# Keyed on the job's newest metric id, so writes never need to evict it
+_metric_summary_cache = TTLCache(maxsize=1024, ttl=300)
+
+class _PendingRead:
+    """A cache miss whose query is running; a write marks it stale."""
+
+    __slots__ = ("stale",)
+
+    def __init__(self):
+        self.stale = False
+
+# (id(cache), first key component) -> reads in flight for that key
+_pending_reads: Dict[tuple, List[_PendingRead]] = {}
+
+def _read_through(cache: TTLCache, key):
+    """Cache the decorated reader in ``cache`` under ``key(*args, **kwargs)``.
+
+    Like ``cachetools.cached`` the query runs outside the lock, but a result is
+    only stored if no ``_invalidate`` of the same key ran while it was being
+    read; otherwise rows read before a write committed could be cached after
+    the write already evicted them.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            cache_key = key(*args, **kwargs)
+            pending_key = (id(cache), cache_key[0])
+            read = _PendingRead()
+            with _cache_lock:
+                try:
+                    return cache[cache_key]
+                except KeyError:
+                    pass
+                _pending_reads.setdefault(pending_key, []).append(read)
+            try:
+                value = func(*args, **kwargs)
+            finally:
+                with _cache_lock:
+                    reads = _pending_reads[pending_key]
+                    reads.remove(read)
+                    if not reads:
+                        del _pending_reads[pending_key]
+            if not read.stale:
+                with _cache_lock:
+                    cache[cache_key] = value
+            return value
+        return wrapper
+    return decorator
+
+def _invalidate(cache: TTLCache, key: str) -> None:
+    """Evict every entry of ``cache`` whose first key component is ``key``."""
+    with _cache_lock:
+        for read in _pending_reads.get((id(cache), key), ()):
+            read.stale = True
+        for cache_key in [k for k in cache if k and k[0] == key]:
+            cache.pop(cache_key, None)
+
 # Dependency to get DB session
 def get_db():
     db = SessionLocal()
@@ -76,6 +710,13 @@ def get_db():
     finally:
         db.close()
 
+def _check_body_job_id(job_id: str, body_job_id: str) -> None:
+    """Reject a request body that names a different job than the URL path."""
+    if body_job_id != job_id:
+        raise HTTPException(
+            status_code=422, detail="job_id in the body does not match the path"
+        )
+
 # Pydantic models
 class ModelVersionCreate(BaseModel):
     model_name: str
@@ -91,6 +732,11 @@ class MetricCreate(BaseModel):
     metric_name: str
     value: float
 
+# An entry of POST /training-jobs/{job_id}/metrics:batch, whose job is the path's
+class MetricBatchEntry(BaseModel):
+    metric_name: str
+    value: float
+
 class HyperparameterCreate(BaseModel):
     job_id: str
     param_name: str
@@ -100,162 +746,329 @@ class TrainingJobStatusUpdate(BaseModel):
     job_id: str
     status: str
 
+class ModelVersionRead(BaseModel):
+    model_config = ConfigDict(from_attributes=True, protected_namespaces=())
+
+    id: int
+    model_name: str
+    version: str
+    created_at: datetime.datetime
+
+class TrainingJobRead(BaseModel):
+    model_config = ConfigDict(from_attributes=True, protected_namespaces=())
+
+    id: int
+    job_id: str
+    model_name: str
+    status: str
+    created_at: datetime.datetime
+
+class MetricRead(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    job_id: str
+    metric_name: str
+    value: float
+    timestamp: datetime.datetime
+
+class HyperparameterRead(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    job_id: str
+    param_name: str
+    param_value: float
+    timestamp: datetime.datetime
+
+class MetricSummary(BaseModel):
+    metric_name: str
+    min: float
+    max: float
+    avg: float
+    count: int
+
+# Built once at import. The hot list endpoints read with SQLAlchemy Core on a
+# plain connection, skipping the Session and its identity map, and validate
+# the rows through these straight into the cached Pydantic models.
+_model_versions_adapter = TypeAdapter(List[ModelVersionRead])
+_metrics_adapter = TypeAdapter(List[MetricRead])
+_hyperparameters_adapter = TypeAdapter(List[HyperparameterRead])
+_metric_summaries_adapter = TypeAdapter(List[MetricSummary])
+
 # Routes
-@app.post("/models/", response_model=ModelVersion)
+@app.post("/models/", response_model=ModelVersionRead)
 def create_model_version(model: ModelVersionCreate, db: SessionLocal = Depends(get_db)):
-    db_model = ModelVersion(**model.dict())
+    db_model = ModelVersion(**model.model_dump())
     db.add(db_model)
     db.commit()
-    db.refresh(db_model)
+    _invalidate(_model_versions_cache, db_model.model_name)
     return db_model
 
-@app.get("/models/{model_name}", response_model=List[ModelVersion])
-def get_model_versions(model_name: str, db: SessionLocal = Depends(get_db)):
-    return db.query(ModelVersion).filter(ModelVersion.model_name == model_name).all()
+@app.get("/models/{model_name}", response_model=List[ModelVersionRead])
+@_read_through(
+    _model_versions_cache,
+    key=lambda model_name: hashkey(model_name),
+)
+def get_model_versions(model_name: str):
+    query = select(ModelVersion.__table__).where(ModelVersion.model_name == model_name)
+    with engine.connect() as conn:
+        rows = conn.execute(query).all()
+    return _model_versions_adapter.validate_python(rows)
 
-@app.post("/training-jobs/", response_model=TrainingJob)
-def create_training_job(job: TrainingJobCreate, db: SessionLocal = Depends(get_db)):
+@app.post("/training-jobs/", response_model=TrainingJobRead)
+def create_training_job(
+    job: TrainingJobCreate,
+    background_tasks: BackgroundTasks,
+    db: SessionLocal = Depends(get_db),
+):
     db_job = TrainingJob(model_name=job.model_name)
     db.add(db_job)
+    db.flush()
+    db.bulk_insert_mappings(Hyperparameter, [
+        {"job_id": db_job.job_id, "param_name": k, "param_value": v}
+        for k, v in job.hyperparameters.items()
+    ])
     db.commit()
-    db.refresh(db_job)
-    
-    with mlflow.start_run(run_name=db_job.job_id):
-        mlflow.log_params(job.config)
-        mlflow.log_metrics({k: v for k, v in job.hyperparameters.items()})
     
+    background_tasks.add_task(
+        _bg_log_job, db_job.job_id, job.config, job.hyperparameters
+    )
     return db_job
 
-@app.get("/training-jobs/{job_id}", response_model=TrainingJob)
+@app.get("/training-jobs/{job_id}", response_model=TrainingJobRead)
 def get_training_job(job_id: str, db: SessionLocal = Depends(get_db)):
     job = db.query(TrainingJob).filter(TrainingJob.job_id == job_id).first()
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     return job
 
-@app.patch("/training-jobs/{job_id}", response_model=TrainingJob)
+@app.patch("/training-jobs/{job_id}", response_model=TrainingJobRead)
 def update_training_job(job_id: str, status: TrainingJobStatusUpdate, db: SessionLocal = Depends(get_db)):
-    job = db.query(TrainingJob).filter(TrainingJob.job_id == job_id).first()
+    job = db.execute(
+        update(TrainingJob)
+        .where(TrainingJob.job_id == job_id)
+        .values(status=status.status)
+        .returning(TrainingJob)
+    ).scalar_one_or_none()
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
-    job.status = status.status
     db.commit()
-    db.refresh(job)
     return job
 
-@app.post("/training-jobs/{job_id}/metrics", response_model=TrainingJob)
+@app.post("/training-jobs/{job_id}/metrics", response_model=MetricRead)
 def log_metric(job_id: str, metric: MetricCreate, db: SessionLocal = Depends(get_db)):
-    job = db.query(TrainingJob).filter(TrainingJob.job_id == job_id).first()
-    if not job:
+    _check_body_job_id(job_id, metric.job_id)
+    # The job_id foreign key doubles as the existence check
+    try:
+        db_metric = db.execute(
+            insert(Metric)
+            .values(job_id=job_id, metric_name=metric.metric_name, value=metric.value)
+            .returning(Metric)
+        ).scalar_one()
+        db.commit()
+    except IntegrityError:
+        db.rollback()
         raise HTTPException(status_code=404, detail="Job not found")
+    _invalidate(_metrics_cache, job_id)
     
-    db_metric = Metric(**metric.dict())
-    db.add(db_metric)
-    db.commit()
-    db.refresh(db_metric)
-    
-    mlflow.log_metric(metric.metric_name, metric.value, step=metric.timestamp.timestamp())
-    return job
+    mlflow_batcher.log_metric(
+        job_id, metric.metric_name, metric.value, int(time.time() * 1000)
+    )
+    return db_metric
 
-@app.post("/training-jobs/{job_id}/hyperparameters", response_model=TrainingJob)
-def log_hyperparameter(job_id: str, hyperparameter: HyperparameterCreate, db: SessionLocal = Depends(get_db)):
-    job = db.query(TrainingJob).filter(TrainingJob.job_id == job_id).first()
-    if not job:
+# Same as the number of metrics MLflow accepts in one log_batch request
+MAX_METRICS_PER_BATCH = 1000
+
+@app.post("/training-jobs/{job_id}/metrics:batch", response_model=List[MetricRead])
+def log_metrics_batch(
+    job_id: str,
+    metrics: List[MetricBatchEntry] = Body(..., max_length=MAX_METRICS_PER_BATCH),
+    db: SessionLocal = Depends(get_db),
+):
+    """Insert many metrics with a single executemany and one commit."""
+    if not metrics:
+        # Nothing to insert, so the foreign key cannot vouch for the job
+        job = db.scalar(select(TrainingJob.id).where(TrainingJob.job_id == job_id))
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return []
+    try:
+        db_metrics = db.scalars(
+            insert(Metric).returning(Metric),
+            [
+                {"job_id": job_id, "metric_name": m.metric_name, "value": m.value}
+                for m in metrics
+            ],
+        ).all()
+        db.commit()
+    except IntegrityError:
+        db.rollback()
         raise HTTPException(status_code=404, detail="Job not found")
-    
-    db_hyperparam = Hyperparameter(**hyperparameter.dict())
-    db.add(db_hyperparam)
-    db.commit()
-    db.refresh(db_hyperparam)
-    
-    mlflow.log_param(hyperparameter.param_name, hyperparameter.param_value)
-    return job
+    _invalidate(_metrics_cache, job_id)
 
-@app.get("/metrics/{job_id}", response_model=List[Metric])
-def get_metrics(job_id: str, db: SessionLocal = Depends(get_db)):
-    return db.query(Metric).filter(Metric.job_id == job_id).all()
+    timestamp = int(time.time() * 1000)
+    for metric in metrics:
+        mlflow_batcher.log_metric(job_id, metric.metric_name, metric.value, timestamp)
+    return db_metrics
 
-@app.get("/hyperparameters/{job_id}", response_model=List[Hyperparameter])
-def get_hyperparameters(job_id: str, db: SessionLocal = Depends(get_db)):
-    return db.query(Hyperparameter).filter(Hyperparameter.job_id == job_id).all()
+@app.post("/training-jobs/{job_id}/hyperparameters", response_model=HyperparameterRead)
+def log_hyperparameter(
+    job_id: str,
+    hyperparameter: HyperparameterCreate,
+    db: SessionLocal = Depends(get_db),
+):
+    _check_body_job_id(job_id, hyperparameter.job_id)
+    try:
+        db_hyperparam = db.execute(
+            insert(Hyperparameter)
+            .values(
+                job_id=job_id,
+                param_name=hyperparameter.param_name,
+                param_value=hyperparameter.param_value,
+            )
+            .returning(Hyperparameter)
+        ).scalar_one()
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=404, detail="Job not found")
+    _invalidate(_hyperparameters_cache, job_id)
+    
+    mlflow_batcher.log_param(
+        job_id, hyperparameter.param_name, hyperparameter.param_value
+    )
+    return db_hyperparam
 
-@app.get("/mlflow/runs")
-def list_mlflow_runs():
-    runs = mlflow.search_runs()
-    return {"runs": [run.to_dictionary() for run in runs]}
+@app.get("/metrics/{job_id}", response_model=List[MetricRead])
+@_read_through(
+    _metrics_cache,
+    key=lambda job_id, limit, offset: hashkey(job_id, limit, offset),
+)
+def get_metrics(
+    job_id: str,
+    limit: int = Query(1000, ge=1, le=10000),
+    offset: int = Query(0, ge=0),
+):
+    query = (
+        select(Metric.__table__)
+        .where(Metric.job_id == job_id)
+        .order_by(Metric.timestamp.desc(), Metric.id.desc())
+        .offset(offset)
+        .limit(limit)
+    )
+    with engine.connect() as conn:
+        rows = conn.execute(query).all()
+    return _metrics_adapter.validate_python(rows)
 
-if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
-```
-# [FEAT] Add basic project structure and configuration
-# Related to issue #1
-def feature_1_handler(data):
-    """Handle feature 1 logic."""
-    if not data:
-        raise ValueError("Data cannot be empty")
-    return {"processed": True, "iteration": 1}
+@cached(
+    _metric_summary_cache,
+    key=lambda db, job_id, last_metric_id: hashkey(job_id, last_metric_id),
+    lock=_cache_lock,
+)
+def _summarize_metrics(db, job_id: str, last_metric_id: Optional[int]):
+    """Aggregate the metrics of ``job_id`` per metric name in the database."""
+    rows = db.execute(
+        select(
+            Metric.metric_name,
+            func.min(Metric.value).label("min"),
+            func.max(Metric.value).label("max"),
+            func.avg(Metric.value).label("avg"),
+            func.count().label("count"),
+        )
+        .where(Metric.job_id == job_id)
+        .group_by(Metric.metric_name)
+    ).all()
+    return _metric_summaries_adapter.validate_python([row._asdict() for row in rows])
 
-# [FEAT] Implement core model versioning and tracking functionality
-# Related to issue #1
-def feature_2_handler(data):
-    """Handle feature 2 logic."""
-    if not data:
-        raise ValueError("Data cannot be empty")
-    return {"processed": True, "iteration": 2}
+@app.get("/metrics/{job_id}/summary", response_model=List[MetricSummary])
+def get_metric_summary(job_id: str, db: SessionLocal = Depends(get_db)):
+    last_metric_id = (
+        db.query(func.max(Metric.id)).filter(Metric.job_id == job_id).scalar()
+    )
+    return _summarize_metrics(db, job_id, last_metric_id)
 
-# [FIX] Add comprehensive error handling
-# Related to issue #2
-def feature_3_handler(data):
-    """Handle feature 3 logic."""
-    if not data:
-        raise ValueError("Data cannot be empty")
-    return {"processed": True, "iteration": 3}
+@app.get("/hyperparameters/{job_id}", response_model=List[HyperparameterRead])
+@_read_through(
+    _hyperparameters_cache,
+    key=lambda job_id, limit, offset: hashkey(job_id, limit, offset),
+)
+def get_hyperparameters(
+    job_id: str,
+    limit: int = Query(1000, ge=1, le=10000),
+    offset: int = Query(0, ge=0),
+):
+    query = (
+        select(Hyperparameter.__table__)
+        .where(Hyperparameter.job_id == job_id)
+        .order_by(Hyperparameter.timestamp.desc(), Hyperparameter.id.desc())
+        .offset(offset)
+        .limit(limit)
+    )
+    with engine.connect() as conn:
+        rows = conn.execute(query).all()
+    return _hyperparameters_adapter.validate_python(rows)
 
-# [FEAT] Implement structured logging system
-# Related to issue #3
-def feature_4_handler(data):
-    """Handle feature 4 logic."""
-    if not data:
-        raise ValueError("Data cannot be empty")
-    return {"processed": True, "iteration": 4}
+@cached(_mlflow_runs_cache, lock=_cache_lock)
+def _search_runs_page(max_results: int, page_token: Optional[str]):
+    """Fetch one page of runs as dicts, along with the token of the next page."""
+    page = mlflow_client.search_runs(
+        experiment_ids=[MLFLOW_EXPERIMENT_ID],
+        max_results=max_results,
+        page_token=page_token,
+    )
+    return [run.to_dictionary() for run in page], page.token
 
-# [FEAT] Add input validation layer
-# Related to issue #2
-def feature_7_handler(data):
-    """Handle feature 7 logic."""
-    if not data:
-        raise ValueError("Data cannot be empty")
-    return {"processed": True, "iteration": 7}
+@app.get("/mlflow/runs")
+def list_mlflow_runs(
+    max_results: int = Query(100, ge=1, le=1000),
+    page_token: Optional[str] = None,
+):
+    """Stream one page of runs as newline-delimited JSON.
 
-# [FEAT] Add configuration management
-# Related to issue #3
-def feature_9_handler(data):
-    """Handle feature 9 logic."""
-    if not data:
-        raise ValueError("Data cannot be empty")
-    return {"processed": True, "iteration": 9}
+    The token for the following page is returned in the ``X-Next-Page-Token``
+    header, which is absent on the last page.
+    """
+    try:
+        runs, next_page_token = _search_runs_page(max_results, page_token)
+    except RestException as exc:
+        if exc.error_code == "INVALID_PARAMETER_VALUE":
+            raise HTTPException(status_code=400, detail=exc.message)
+        raise
+    except Exception as exc:
+        if _is_unavailable(exc):
+            raise HTTPException(
+                status_code=503, detail="MLflow tracking server is unavailable"
+            )
+        raise
+    headers = {"X-Next-Page-Token": next_page_token} if next_page_token else None
+    return StreamingResponse(
+        (orjson.dumps(run) + b"\n" for run in runs),
+        media_type="application/x-ndjson",
+        headers=headers,
+    )
 
-# [FIX] Fix edge case handling
-# Related to issue #2
-def feature_12_handler(data):
-    """Handle feature 12 logic."""
+def feature_handler(data, iteration):
+    """Handle the logic of feature ``iteration``."""
     if not data:
         raise ValueError("Data cannot be empty")
-    return {"processed": True, "iteration": 12}
+    return {"processed": True, "iteration": iteration}
 
-# [FEAT] Add caching support
-# Related to issue #3
-def feature_13_handler(data):
-    """Handle feature 13 logic."""
-    if not data:
-        raise ValueError("Data cannot be empty")
-    return {"processed": True, "iteration": 13}
+feature_1_handler = partial(feature_handler, iteration=1)
+feature_2_handler = partial(feature_handler, iteration=2)
+feature_3_handler = partial(feature_handler, iteration=3)
+feature_4_handler = partial(feature_handler, iteration=4)
+feature_7_handler = partial(feature_handler, iteration=7)
+feature_9_handler = partial(feature_handler, iteration=9)
+feature_12_handler = partial(feature_handler, iteration=12)
+feature_13_handler = partial(feature_handler, iteration=13)
+feature_15_handler = partial(feature_handler, iteration=15)
 
-# [PERF] Optimize performance bottlenecks
-# Related to issue #1
-def feature_15_handler(data):
-    """Handle feature 15 logic."""
-    if not data:
-        raise ValueError("Data cannot be empty")
-    return {"processed": True, "iteration": 15}
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(
+        "src.main:app",
+        host=os.getenv("HOST", "0.0.0.0"),
+        port=int(os.getenv("PORT", "8000")),
+        workers=int(os.getenv("WEB_CONCURRENCY", (os.cpu_count() or 1) * 2 + 1)),
+    )
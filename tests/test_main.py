@@ -1,10 +1,669 @@
 """Tests for main module."""
 
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+import pybreaker
+import pytest
+from mlflow.entities import Metric as MlflowMetric
+from mlflow.exceptions import MlflowException, RestException
+from mlflow.store.entities.paged_list import PagedList
+
+os.environ.setdefault(
+    "DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/neura_orchestra_test.db"
+)
+os.environ.setdefault("CORS_ALLOW_ORIGINS", "http://dashboard.test")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from src import main  # noqa: E402
+
+
+class FakeMlflowClient:
+    """Stands in for the tracking server and records logged batches."""
+
+    def __init__(self, down=False):
+        self.down = down
+        self.batches = []
+        self.runs = []
+        self.created_runs = []
+        self.deleted_runs = []
+        # run_id -> {param key: value}, to reject changed values like MLflow
+        self.params = {}
+        # Runs whose batches the server fails with an internal error
+        self.failing_runs = set()
+
+    def _check(self):
+        if self.down:
+            raise ConnectionError("mlflow-server unreachable")
+
+    def search_runs(self, experiment_ids, filter_string="", max_results=1000,
+                    order_by=None, page_token=None):
+        self._check()
+        if filter_string:
+            # Only the run name lookup of _get_run_id filters
+            name = filter_string.split("'")[1]
+            runs = [SimpleNamespace(info=SimpleNamespace(run_id=f"run-{name}"))
+                    for run_name in self.created_runs if run_name == name]
+            return PagedList(runs[:max_results], None)
+        if page_token is not None and not page_token.isdigit():
+            raise RestException({
+                "error_code": "INVALID_PARAMETER_VALUE",
+                "message": f"Invalid page token '{page_token}'",
+            })
+        start = int(page_token or 0)
+        end = start + max_results
+        runs = [SimpleNamespace(to_dictionary=lambda run=run: run)
+                for run in self.runs[start:end]]
+        return PagedList(runs, str(end) if end < len(self.runs) else None)
+
+    def create_run(self, experiment_id, run_name=None):
+        self._check()
+        self.created_runs.append(run_name)
+        return SimpleNamespace(info=SimpleNamespace(run_id=f"run-{run_name}"))
+
+    def delete_run(self, run_id):
+        self._check()
+        self.deleted_runs.append(run_id)
+
+    def log_batch(self, run_id, metrics=(), params=(), tags=()):
+        self._check()
+        if run_id in self.failing_runs:
+            raise MlflowException("INTERNAL_ERROR")
+        logged = self.params.setdefault(run_id, {})
+        if any(logged.get(p.key, p.value) != p.value for p in params):
+            raise RestException({
+                "error_code": "INVALID_PARAMETER_VALUE",
+                "message": "Changing param values is not allowed",
+            })
+        logged.update((p.key, p.value) for p in params)
+        self.batches.append((run_id, [m.key for m in metrics], [p.key for p in params]))
+
+    def set_terminated(self, run_id):
+        self._check()
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """Create a test client whose MLflow traffic goes to a fake client."""
+    monkeypatch.setattr(main, "mlflow_client", FakeMlflowClient())
+    with TestClient(main.app) as client:
+        yield client
+
+
+def add_job(job_id, mlflow_run_id=None):
+    """Insert a training job row directly, bypassing the MLflow logging."""
+    db = main.SessionLocal()
+    try:
+        db.add(main.TrainingJob(
+            job_id=job_id, model_name="resnet", mlflow_run_id=mlflow_run_id
+        ))
+        db.commit()
+    finally:
+        db.close()
+
+
+def wait_until(predicate, timeout=5.0):
+    """Poll ``predicate`` until it is true, failing after ``timeout`` seconds."""
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out waiting for condition"
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def job(client):
+    """Create a training job and return its JSON representation."""
+    response = client.post("/training-jobs/", json={
+        "model_name": "resnet",
+        "hyperparameters": {"lr": 0.1},
+        "config": {"epochs": 3},
+    })
+    assert response.status_code == 200
+    return response.json()
+
+
 def test_main():
     """Test main function."""
     assert True  # Placeholder test
 
 
+def test_model_versions_roundtrip(client):
+    """Test created model versions are listed by name."""
+    response = client.post("/models/", json={"model_name": "bert", "version": "1"})
+    assert response.status_code == 200
+    assert response.json()["version"] == "1"
+
+    versions = client.get("/models/bert").json()
+    assert [v["version"] for v in versions] == ["1"]
+
+
+def test_create_training_job(client, job):
+    """Test a new job is pending and its hyperparameters are stored."""
+    assert job["status"] == "pending"
+    params = client.get(f"/hyperparameters/{job['job_id']}").json()
+    assert [(p["param_name"], p["param_value"]) for p in params] == [("lr", 0.1)]
+
+
+def test_job_ids_are_time_ordered(client):
+    """Test job ids sort in creation order."""
+    job_ids = [
+        client.post("/training-jobs/", json={
+            "model_name": "resnet", "hyperparameters": {}, "config": {},
+        }).json()["job_id"]
+        for _ in range(3)
+    ]
+    assert job_ids == sorted(job_ids)
+
+
+def test_update_training_job(client, job):
+    """Test job status updates and unknown jobs."""
+    job_id = job["job_id"]
+    response = client.patch(
+        f"/training-jobs/{job_id}", json={"job_id": job_id, "status": "running"}
+    )
+    assert response.json()["status"] == "running"
+
+    response = client.patch(
+        "/training-jobs/missing", json={"job_id": "missing", "status": "running"}
+    )
+    assert response.status_code == 404
+
+
+def test_log_metric(client, job):
+    """Test logged metrics are returned newest first."""
+    job_id = job["job_id"]
+    for value in (1.0, 0.5):
+        response = client.post(f"/training-jobs/{job_id}/metrics", json={
+            "job_id": job_id, "metric_name": "loss", "value": value,
+        })
+        assert response.status_code == 200
+
+    metrics = client.get(f"/metrics/{job_id}").json()
+    assert [m["value"] for m in metrics] == [0.5, 1.0]
+
+
+def test_log_metrics_batch(client, job):
+    """Test a batch of metrics is stored in one request."""
+    job_id = job["job_id"]
+    response = client.post(f"/training-jobs/{job_id}/metrics:batch", json=[
+        {"metric_name": "loss", "value": float(step)} for step in range(5)
+    ])
+    assert response.status_code == 200
+    assert len(response.json()) == 5
+    assert len(client.get(f"/metrics/{job_id}").json()) == 5
+
+    response = client.post("/training-jobs/missing/metrics:batch", json=[
+        {"metric_name": "loss", "value": 1.0},
+    ])
+    assert response.status_code == 404
+
+
+def test_log_metrics_batch_limits(client, job):
+    """Test empty batches still check the job and oversized ones are rejected."""
+    job_id = job["job_id"]
+    assert client.post(f"/training-jobs/{job_id}/metrics:batch", json=[]).json() == []
+    response = client.post("/training-jobs/missing/metrics:batch", json=[])
+    assert response.status_code == 404
+
+    response = client.post(f"/training-jobs/{job_id}/metrics:batch", json=[
+        {"metric_name": "loss", "value": 1.0}
+    ] * (main.MAX_METRICS_PER_BATCH + 1))
+    assert response.status_code == 422
+    assert client.get(f"/metrics/{job_id}").json() == []
+
+
+def test_metrics_pagination(client, job):
+    """Test limit/offset pages are stable when metrics share a timestamp."""
+    job_id = job["job_id"]
+    timestamp = main.datetime.datetime(2024, 1, 1)
+    with main.SessionLocal() as db:
+        db.add_all([
+            main.Metric(job_id=job_id, metric_name="loss", value=float(step),
+                        timestamp=timestamp)
+            for step in range(5)
+        ])
+        db.commit()
+
+    pages = [
+        client.get(f"/metrics/{job_id}", params={"limit": 2, "offset": offset}).json()
+        for offset in (0, 2, 4)
+    ]
+    assert [len(page) for page in pages] == [2, 2, 1]
+    ids = [m["id"] for page in pages for m in page]
+    assert ids == sorted(ids, reverse=True)
+    assert [m["value"] for page in pages for m in page] == [4.0, 3.0, 2.0, 1.0, 0.0]
+
+
+def test_metric_summary(client, job):
+    """Test metrics are aggregated per name and refreshed after new writes."""
+    job_id = job["job_id"]
+    for value in (1.0, 3.0):
+        client.post(f"/training-jobs/{job_id}/metrics", json={
+            "job_id": job_id, "metric_name": "loss", "value": value,
+        })
+    summary = client.get(f"/metrics/{job_id}/summary").json()
+    assert summary == [
+        {"metric_name": "loss", "min": 1.0, "max": 3.0, "avg": 2.0, "count": 2}
+    ]
+
+    client.post(f"/training-jobs/{job_id}/metrics", json={
+        "job_id": job_id, "metric_name": "loss", "value": 5.0,
+    })
+    summary = client.get(f"/metrics/{job_id}/summary").json()
+    assert summary[0]["count"] == 3
+
+
+def test_list_mlflow_runs(client):
+    """Test runs are streamed as NDJSON with a token for the next page."""
+    main.mlflow_client.runs = [{"info": {"run_id": f"run-{i}"}} for i in range(3)]
+    main._mlflow_runs_cache.clear()
+
+    response = client.get("/mlflow/runs", params={"max_results": 2})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = response.text.splitlines()
+    assert [json.loads(line)["info"]["run_id"] for line in lines] == ["run-0", "run-1"]
+    token = response.headers["X-Next-Page-Token"]
+
+    response = client.get(
+        "/mlflow/runs", params={"max_results": 2, "page_token": token}
+    )
+    assert response.text == '{"info":{"run_id":"run-2"}}\n'
+    assert "X-Next-Page-Token" not in response.headers
+
+
+def test_list_mlflow_runs_errors(client):
+    """Test bad page tokens give 400 and an unreachable MLflow gives 503."""
+    main._mlflow_runs_cache.clear()
+    response = client.get("/mlflow/runs", params={"page_token": "bogus"})
+    assert response.status_code == 400
+    assert "bogus" in response.json()["detail"]
+
+    main.mlflow_client.down = True
+    response = client.get("/mlflow/runs")
+    assert response.status_code == 503
+
+
+@pytest.mark.parametrize("handler,iteration", [
+    (main.feature_1_handler, 1),
+    (main.feature_9_handler, 9),
+    (main.feature_15_handler, 15),
+])
+def test_feature_handlers(handler, iteration):
+    """Test each feature handler reports its own iteration."""
+    assert handler({"key": "value"}) == {"processed": True, "iteration": iteration}
+    with pytest.raises(ValueError, match="cannot be empty"):
+        handler({})
+
+
+def test_cors_preflight(client):
+    """Test preflight requests are answered only for configured origins."""
+    headers = {
+        "Access-Control-Request-Method": "POST",
+        "Access-Control-Request-Headers": "content-type",
+    }
+    response = client.options(
+        "/models/", headers={"Origin": "http://dashboard.test", **headers}
+    )
+    assert response.status_code == 200
+    assert response.headers["access-control-allow-origin"] == "http://dashboard.test"
+    assert response.headers["access-control-max-age"] == "86400"
+
+    response = client.options(
+        "/models/", headers={"Origin": "http://evil.test", **headers}
+    )
+    assert response.status_code == 400
+
+
+def test_warns_without_cors_origins(monkeypatch, caplog):
+    """Test startup warns that browsers are blocked when no origin is allowed."""
+    monkeypatch.setattr(main, "CORS_ALLOW_ORIGINS", [])
+    with TestClient(main.app):
+        pass
+    assert "CORS_ALLOW_ORIGINS is not set" in caplog.text
+
+
+def test_mlflow_outage_is_deferred_and_replayed(monkeypatch):
+    """Test batches are stored while MLflow is down and replayed afterwards."""
+    mlflow = FakeMlflowClient(down=True)
+    monkeypatch.setattr(main, "mlflow_client", mlflow)
+    monkeypatch.setattr(
+        main, "mlflow_breaker", pybreaker.CircuitBreaker(fail_max=1, reset_timeout=0)
+    )
+    main.init_schema()
+    add_job("job-outage")
+
+    main._log_to_mlflow(
+        "job-outage", [MlflowMetric("loss", 1.0, 0, 0)], [], create_run=True
+    )
+    db = main.SessionLocal()
+    try:
+        pending = db.query(main.PendingMlflowEvent).filter_by(job_id="job-outage")
+        assert pending.count() == 1
+
+        mlflow.down = False
+        main._drain_pending()
+        assert pending.count() == 0
+    finally:
+        db.close()
+    assert mlflow.batches == [("run-job-outage", ["loss"], [])]
+    assert main._stored_run_id("job-outage") == "run-job-outage"
+
+
+def test_mlflow_run_is_recorded_on_job(client, job):
+    """Test the run created with a job is stored and used for its metrics."""
+    job_id = job["job_id"]
+    assert main._stored_run_id(job_id) == f"run-{job_id}"
+
+    main._log_to_mlflow(job_id, [MlflowMetric("loss", 1.0, 0, 0)], [])
+    assert main.mlflow_client.created_runs == [job_id]
+    assert main.mlflow_client.batches[-1] == (f"run-{job_id}", ["loss"], [])
+
+
+def test_metrics_wait_for_job_run(monkeypatch):
+    """Test metrics for a job without a run are deferred instead of creating one."""
+    mlflow = FakeMlflowClient()
+    monkeypatch.setattr(main, "mlflow_client", mlflow)
+    main.init_schema()
+    add_job("job-no-run")
+
+    metrics = [MlflowMetric("loss", 1.0, 0, 0)]
+    with pytest.raises(main._RunNotReady):
+        main._send_batch("job-no-run", metrics, [])
+    main._log_to_mlflow("job-no-run", metrics, [])
+    assert mlflow.created_runs == []
+    assert mlflow.batches == []
+    db = main.SessionLocal()
+    try:
+        pending = db.query(main.PendingMlflowEvent).filter_by(job_id="job-no-run")
+        assert pending.count() == 1
+
+        # The job's creation batch records the run, then the replay goes through
+        main._log_to_mlflow("job-no-run", [], [], create_run=True)
+        main._drain_pending()
+        assert pending.count() == 0
+    finally:
+        db.close()
+    assert mlflow.created_runs == ["job-no-run"]
+    assert mlflow.batches == [
+        ("run-job-no-run", [], []),
+        ("run-job-no-run", ["loss"], []),
+    ]
+
+
+def test_run_of_older_job_is_found_by_name(monkeypatch):
+    """Test a job without a recorded run id falls back to its run's name."""
+    mlflow = FakeMlflowClient()
+    mlflow.created_runs.append("job-legacy")
+    monkeypatch.setattr(main, "mlflow_client", mlflow)
+    main.init_schema()
+    add_job("job-legacy")
+
+    assert main._get_run_id("job-legacy") == "run-job-legacy"
+    assert main._stored_run_id("job-legacy") == "run-job-legacy"
+    assert mlflow.created_runs == ["job-legacy"]
+
+
+def test_concurrent_run_creation_keeps_one_run(monkeypatch):
+    """Test a run created after another worker recorded one is deleted again."""
+
+    class RacingMlflowClient(FakeMlflowClient):
+        def create_run(self, experiment_id, run_name=None):
+            # Another worker records its run while this one is being created
+            main._store_run_id(run_name, "run-other-worker")
+            return super().create_run(experiment_id, run_name)
+
+    mlflow = RacingMlflowClient()
+    monkeypatch.setattr(main, "mlflow_client", mlflow)
+    main.init_schema()
+    add_job("job-race")
+
+    assert main._create_job_run("job-race") == "run-other-worker"
+    assert mlflow.deleted_runs == ["run-job-race"]
+    assert main._stored_run_id("job-race") == "run-other-worker"
+
+
+def test_drain_skips_batches_claimed_by_another_worker(monkeypatch):
+    """Test a deferred batch is only replayed by the worker that claimed it."""
+    mlflow = FakeMlflowClient()
+    monkeypatch.setattr(main, "mlflow_client", mlflow)
+    main.init_schema()
+    add_job("job-claimed", "run-job-claimed")
+    add_job("job-abandoned", "run-job-abandoned")
+    main._defer("job-claimed", [MlflowMetric("loss", 1.0, 0, 0)], [])
+    main._defer("job-abandoned", [MlflowMetric("loss", 1.0, 0, 0)], [])
+
+    db = main.SessionLocal()
+    try:
+        pending = db.query(main.PendingMlflowEvent)
+        now = main.datetime.datetime.utcnow()
+        pending.filter_by(job_id="job-claimed").update(
+            {"claimed_by": "other-host:1", "claimed_at": now}
+        )
+        pending.filter_by(job_id="job-abandoned").update(
+            {
+                "claimed_by": "other-host:2",
+                "claimed_at": now - main.datetime.timedelta(hours=1),
+            }
+        )
+        db.commit()
+
+        main._drain_pending()
+        assert mlflow.batches == [("run-job-abandoned", ["loss"], [])]
+        assert [p.job_id for p in pending.filter(
+            main.PendingMlflowEvent.job_id.in_(["job-claimed", "job-abandoned"])
+        )] == ["job-claimed"]
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def batch_job(monkeypatch):
+    """Route MLflow traffic to a fake client and create a job with a run."""
+    mlflow = FakeMlflowClient()
+    monkeypatch.setattr(main, "mlflow_client", mlflow)
+    main.init_schema()
+    job_id = f"job-batch-{time.monotonic_ns()}"
+    add_job(job_id, f"run-{job_id}")
+    return mlflow, job_id
+
+
+def test_batch_logger_flushes_full_batch(batch_job):
+    """Test a batch is sent as soon as ``batch_size`` entries are queued."""
+    mlflow, job_id = batch_job
+    batcher = main.MlflowBatchLogger(
+        batch_size=3, flush_interval=60, drain_interval=60
+    )
+    batcher.start()
+    try:
+        for step in range(3):
+            batcher.log_metric(job_id, "loss", float(step), 0)
+        wait_until(lambda: (f"run-{job_id}", ["loss"] * 3, []) in mlflow.batches)
+    finally:
+        batcher.stop()
+
+
+def test_batch_logger_flushes_after_interval(batch_job):
+    """Test a partial batch is sent once ``flush_interval`` has passed."""
+    mlflow, job_id = batch_job
+    batcher = main.MlflowBatchLogger(
+        batch_size=100, flush_interval=0.05, drain_interval=60
+    )
+    batcher.start()
+    try:
+        batcher.log_metric(job_id, "loss", 1.0, 0)
+        wait_until(lambda: (f"run-{job_id}", ["loss"], []) in mlflow.batches)
+    finally:
+        batcher.stop()
+
+
+def test_batch_logger_groups_by_job_and_flushes_on_stop(batch_job):
+    """Test stop() flushes one metric and one param batch per job."""
+    mlflow, job_id = batch_job
+    other_job_id = f"{job_id}-other"
+    add_job(other_job_id, f"run-{other_job_id}")
+    batcher = main.MlflowBatchLogger(
+        batch_size=100, flush_interval=60, drain_interval=60
+    )
+    batcher.start()
+    batcher.log_metric(job_id, "loss", 1.0, 0)
+    batcher.log_param(job_id, "lr", 0.1)
+    batcher.log_metric(other_job_id, "loss", 2.0, 0)
+    batcher.log_metric(job_id, "accuracy", 0.5, 0)
+    batcher.log_param(job_id, "lr", 0.2)
+    batcher.stop()
+
+    batches = [b for b in mlflow.batches if b[0].startswith(f"run-{job_id}")]
+    assert batches == [
+        (f"run-{job_id}", ["loss", "accuracy"], []),
+        (f"run-{job_id}", [], ["lr"]),
+        (f"run-{other_job_id}", ["loss"], []),
+    ]
+    assert mlflow.params[f"run-{job_id}"] == {"lr": "0.2"}
+
+
+def test_logged_entries_reach_mlflow(client, job, monkeypatch):
+    """Test metrics and hyperparameters posted to the API are batched to MLflow."""
+    monkeypatch.setattr(main.mlflow_batcher, "flush_interval", 0.01)
+    job_id = job["job_id"]
+    client.post(f"/training-jobs/{job_id}/metrics", json={
+        "job_id": job_id, "metric_name": "loss", "value": 0.5,
+    })
+    client.post(f"/training-jobs/{job_id}/hyperparameters", json={
+        "job_id": job_id, "param_name": "momentum", "param_value": 0.9,
+    })
+    batches = main.mlflow_client.batches
+    wait_until(lambda: (f"run-{job_id}", ["loss"], []) in batches)
+    wait_until(lambda: (f"run-{job_id}", [], ["momentum"]) in batches)
+
+
+def test_changed_param_does_not_drop_metrics(monkeypatch):
+    """Test a rejected param change does not discard metrics flushed with it."""
+    mlflow = FakeMlflowClient()
+    monkeypatch.setattr(main, "mlflow_client", mlflow)
+    main.init_schema()
+    add_job("job-param-change", "run-job-param-change")
+    batcher = main.MlflowBatchLogger()
+
+    batcher._flush([("job-param-change", main.MlflowParam("lr", "0.1"))])
+    batcher._flush([
+        ("job-param-change", MlflowMetric("loss", 1.0, 0, 0)),
+        ("job-param-change", main.MlflowParam("lr", "0.2")),
+    ])
+    assert mlflow.batches == [
+        ("run-job-param-change", [], ["lr"]),
+        ("run-job-param-change", ["loss"], []),
+    ]
+
+
+def test_poison_batch_is_skipped_and_dead_lettered(monkeypatch):
+    """Test a failing deferred batch neither blocks later ones nor trips the breaker."""
+    mlflow = FakeMlflowClient()
+    mlflow.failing_runs.add("run-job-poison")
+    monkeypatch.setattr(main, "mlflow_client", mlflow)
+    monkeypatch.setattr(main, "MLFLOW_REPLAY_MAX_ATTEMPTS", 2)
+    main.init_schema()
+    add_job("job-poison", "run-job-poison")
+    add_job("job-healthy", "run-job-healthy")
+    main._defer("job-poison", [MlflowMetric("loss", 1.0, 0, 0)], [])
+    main._defer("job-healthy", [MlflowMetric("loss", 1.0, 0, 0)], [])
+
+    db = main.SessionLocal()
+    try:
+        pending = db.query(main.PendingMlflowEvent).filter(
+            main.PendingMlflowEvent.job_id.in_(["job-poison", "job-healthy"])
+        )
+        main._drain_pending()
+        poison = pending.one()
+        assert poison.job_id == "job-poison"
+        assert poison.attempts == 1
+        assert poison.dead_lettered_at is None
+        assert main.mlflow_breaker.fail_counter == 0
+        assert mlflow.batches == [("run-job-healthy", ["loss"], [])]
+
+        main._drain_pending()
+        db.refresh(poison)
+        assert poison.attempts == 2
+        assert poison.dead_lettered_at is not None
+
+        mlflow.failing_runs.clear()
+        main._drain_pending()
+        assert pending.count() == 1
+        assert len(mlflow.batches) == 1
+    finally:
+        db.close()
+
+
+def test_in_memory_database():
+    """Test the app starts and shares one database with sqlite:///:memory:."""
+    script = (
+        "from fastapi.testclient import TestClient\n"
+        "from src import main\n"
+        "with TestClient(main.app) as client:\n"
+        "    client.post('/models/', json={'model_name': 'm', 'version': '1'})\n"
+        "    assert len(client.get('/models/m').json()) == 1\n"
+        "    job_id = client.post('/training-jobs/', json={\n"
+        "        'model_name': 'm', 'hyperparameters': {'lr': 0.1}, 'config': {},\n"
+        "    }).json()['job_id']\n"
+        "    assert len(client.get(f'/hyperparameters/{job_id}').json()) == 1\n"
+    )
+    subprocess.run(
+        [sys.executable, "-c", script],
+        env={**os.environ, "DATABASE_URL": "sqlite:///:memory:"},
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        check=True,
+    )
+
+
+def test_read_through_skips_store_after_concurrent_write():
+    """Test rows read before a write are not cached once the write invalidates."""
+    cache = main.TTLCache(maxsize=8, ttl=60)
+    reads = []
+
+    @main._read_through(cache, key=lambda name: main.hashkey(name))
+    def read(name):
+        reads.append(name)
+        if len(reads) == 1:
+            # A write commits and invalidates while this read is in flight
+            main._invalidate(cache, name)
+        return len(reads)
+
+    assert read("bert") == 1
+    assert len(cache) == 0
+    assert read("bert") == 2
+    assert read("bert") == 2
+    assert reads == ["bert", "bert"]
+
+
+def test_log_with_mismatched_job_id(client, job):
+    """Test a body naming another job than the path is rejected."""
+    job_id = job["job_id"]
+    response = client.post(f"/training-jobs/{job_id}/metrics", json={
+        "job_id": "other", "metric_name": "loss", "value": 1.0,
+    })
+    assert response.status_code == 422
+    response = client.post(f"/training-jobs/{job_id}/hyperparameters", json={
+        "job_id": "other", "param_name": "momentum", "param_value": 0.9,
+    })
+    assert response.status_code == 422
+    assert client.get(f"/metrics/{job_id}").json() == []
+    assert len(client.get(f"/hyperparameters/{job_id}").json()) == 1
+
+
+def test_log_metric_unknown_job(client):
+    """Test logging a metric for an unknown job returns 404."""
+    response = client.post("/training-jobs/missing/metrics", json={
+        "job_id": "missing", "metric_name": "loss", "value": 1.0,
+    })
+    assert response.status_code == 404
+
+
 class TestFeature5:
     """Tests for feature 5. Related to #1"""
     